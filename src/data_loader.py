@@ -1,7 +1,61 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, reduce
 from glob import glob
 from os import path, makedirs
 
+@lru_cache(maxsize=256)
+def _get_metadata(file, mtime):
+    """
+    Returns cached parquet footer metadata for a file.
+
+    Parquet files are immutable, so the footer only needs to be parsed once
+    per (path, mtime); repeated loads skip the Thrift-decoding cost entirely.
+    """
+    return pq.ParquetFile(file).metadata
+
+def _read_one(file):
+    """
+    Reads one symbol's parquet file into a (symbol, dates, closes) triple.
+
+    Only close_time/close are projected through pyarrow (skips decoding the
+    unused OHLCV columns); the result stays as plain numpy arrays so the
+    caller can write them straight into a pre-allocated matrix.
+    """
+    metadata = _get_metadata(file, path.getmtime(file))
+    parquet_file = pq.ParquetFile(file, metadata=metadata)
+    # Stream the projected columns in 64k-row batches rather than
+    # materializing the whole file before slicing; only the needed column
+    # chunks are ever decoded. The schema is passed explicitly so a
+    # zero-row file yields an empty table (and an all-NaN column later)
+    # instead of raising from from_batches.
+    schema = pa.schema(
+        [parquet_file.schema_arrow.field(column) for column in ('close_time', 'close')]
+    )
+    table = pa.Table.from_batches(
+        parquet_file.iter_batches(batch_size=65536, columns=['close_time', 'close']),
+        schema=schema,
+    )
+    # Truncate the raw ms timestamps to days with a single Arrow kernel
+    # instead of the two pandas passes (to_datetime + dt.normalize).
+    days = pc.floor_temporal(pc.cast(table['close_time'], pa.timestamp('ms')), unit='day')
+    symbol = path.splitext(path.basename(file))[0]
+    # Cast to float32 on the Arrow side so the hand-off to numpy reuses the
+    # Arrow buffers instead of materializing float64 and re-copying; a null-
+    # free chunk comes across zero-copy.
+    dates = days.combine_chunks().to_numpy(zero_copy_only=False)
+    closes = (
+        pc.cast(table['close'], pa.float32())
+          .combine_chunks()
+          .to_numpy(zero_copy_only=False)
+    )
+    return symbol, dates, closes
+
 def load_and_prepare_prices(data_folder="../data/raw_data", symbol_pattern="USDT"):
     """
     Loads and merges multiple parquet files containing price data for the given symbol pattern.
@@ -24,21 +78,45 @@ def load_and_prepare_prices(data_folder="../data/raw_data", symbol_pattern="USDT
     if not files:
         raise FileNotFoundError(f"No parquet files found for pattern: {symbol_pattern}")
 
-    merged_df = pd.concat(
-        [
-            pd.read_parquet(file)[['close_time', 'close']]
-              .assign(close_time=lambda x: pd.to_datetime(x['close_time'], unit='ms').dt.normalize())
-              .rename(columns={'close': path.splitext(path.basename(file))[0]})
-              .set_index('close_time')
-              .sort_index()
-            for file in files
-        ],
-        axis=1,
-        join='outer'
+    # Read files concurrently: pyarrow releases the GIL during parquet
+    # decompression/decoding, so threads overlap both I/O and decode work.
+    with ThreadPoolExecutor(max_workers=min(16, len(files))) as executor:
+        results = list(executor.map(_read_one, files))
+
+    # Outer-align into one pre-allocated float32 matrix: each symbol's prices
+    # are scattered into its column via searchsorted positions. Unlike a
+    # per-symbol reindex + frame assembly this never holds two copies of the
+    # data, and float32 is plenty for exchange price ticks.
+    union_index = pd.DatetimeIndex(
+        reduce(np.union1d, (dates for _, dates, _ in results))
+    )
+    merged = np.full((len(union_index), len(results)), np.nan, dtype='float32')
+    for column, (_, dates, closes) in enumerate(results):
+        merged[union_index.searchsorted(dates), column] = closes
+
+    merged_df = pd.DataFrame(
+        merged,
+        index=union_index,
+        columns=[symbol for symbol, _, _ in results],
     )
+    merged_df.index.name = 'close_time'
 
     return merged_df
 
+def _month_slices(index):
+    """
+    Finds each month's contiguous row block in a sorted DatetimeIndex.
+
+    Returns the months as a PeriodIndex plus start/stop row offsets. Slicing
+    by offsets replaces a pandas groupby, which hashes every key and builds
+    group objects even though the months are already contiguous runs.
+    """
+    months = index.to_period('M')
+    keys = months.asi8
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    stops = np.r_[starts[1:], len(keys)]
+    return months, starts, stops
+
 def compute_daily_returns(prices: pd.DataFrame) -> pd.DataFrame:
     """
     Computes daily log returns for all assets.
@@ -54,8 +132,11 @@ def compute_daily_returns(prices: pd.DataFrame) -> pd.DataFrame:
         DataFrame with daily log returns.
     """
 
+    # Keep returns in float32: the downstream dot/std/cumprod kernels are
+    # memory-bound, so halving the bytes moved matters more than the extra
+    # mantissa bits (evaluate_portfolio promotes to float64 where it counts).
     returns = prices.pct_change(fill_method=None).dropna(how='all')
-    return returns
+    return returns.astype('float32', copy=False)
 
 def group_returns_by_month(returns: pd.DataFrame):
     """
@@ -73,26 +154,113 @@ def group_returns_by_month(returns: pd.DataFrame):
         Keys = month as string ('YYYY-MM'), values = DataFrame with only complete coins
     """
     
-    returns = returns.copy()
-    returns['month'] = returns.index.to_period('M')
+    if returns.empty:
+        return {}
+
+    if not returns.index.is_monotonic_increasing:
+        returns = returns.sort_index()
+
+    # Months are contiguous row blocks once sorted, so the month boundaries
+    # and the per-month "no NaNs" column masks can all be computed in one
+    # vectorized pass instead of materializing each group and calling dropna.
+    months, starts, stops = _month_slices(returns.index)
+    complete = np.logical_and.reduceat(returns.notna().to_numpy(), starts, axis=0)
 
     monthly_groups = {}
 
-    for month, group in returns.groupby('month'):
-        group = group.drop(columns='month').dropna(axis=1, how='any')
-        monthly_groups[str(month)] = group
+    for i, (start, stop) in enumerate(zip(starts, stops)):
+        group = returns.iloc[start:stop, np.flatnonzero(complete[i])]
+        monthly_groups[str(months[start])] = group
 
     return monthly_groups
 
+def group_returns_flat(returns: pd.DataFrame):
+    """
+    Returns daily returns as one long DataFrame plus a monthly groupby handle.
+
+    Alternative to `group_returns_by_month` for vectorized consumers: instead
+    of a dict of per-month frames (which forces Python-level iteration and
+    per-month pandas dispatch), the data stays in a single frame grouped by
+    a categorical month key so downstream code can run one groupby
+    aggregation over all months at once.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame
+        Daily returns, datetime index, coins as columns
+
+    Returns
+    -------
+    flat : pd.DataFrame
+        The returns, sorted by date if they were not already.
+    grouper : pd.core.groupby.DataFrameGroupBy
+        `flat` grouped by month ('YYYY-MM') in chronological order. The
+        month labels live only in the grouper, so no column is ever
+        written into (or copied onto) the returns frame.
+    """
+    if not returns.index.is_monotonic_increasing:
+        returns = returns.sort_index()
+
+    month = pd.Categorical(returns.index.to_period('M').astype(str))
+    grouper = returns.groupby(month, sort=False, observed=True)
+
+    return returns, grouper
+
 def save_monthly_returns(monthly_returns: dict, out_folder="../data/processed"):
     """
-    Saves monthly return DataFrames into the processed folder, 
-    one file per month (Parquet).
+    Saves monthly returns into the processed folder as one hive-partitioned
+    parquet dataset (month=YYYY-MM directories) instead of a pile of small
+    per-month files, whose footers would dominate read time later.
     """
 
     makedirs(out_folder, exist_ok=True)
 
+    frames = []
     for month, df in monthly_returns.items():
-        file_path = path.join(out_folder, f"monthly_returns_{month}.parquet")
-        df.to_parquet(file_path)
+        frame = df.rename_axis('close_time').reset_index()
+        frame['month'] = month
+        frames.append(frame)
+
+    table = pa.Table.from_pandas(pd.concat(frames), preserve_index=False)
+    ds.write_dataset(
+        table,
+        out_folder,
+        format='parquet',
+        partitioning=['month'],
+        partitioning_flavor='hive',
+        max_rows_per_file=500_000,
+        max_rows_per_group=500_000,
+        existing_data_behavior='overwrite_or_ignore',
+    )
+
+def load_monthly_returns(data_folder="../data/processed"):
+    """
+    Loads the partitioned dataset written by `save_monthly_returns` back
+    into a dict of per-month DataFrames, parsing metadata once for the
+    whole dataset rather than per month.
+
+    Parameters
+    ----------
+    data_folder : str
+        Path to the folder containing the partitioned monthly returns.
+
+    Returns
+    -------
+    monthly_groups : dict
+        Keys = month as string ('YYYY-MM'), values = DataFrame of that
+        month's daily returns (coins as columns).
+    """
+    table = ds.dataset(data_folder, format='parquet', partitioning='hive').to_table()
+    df = table.to_pandas(self_destruct=True)
+
+    monthly_groups = {}
+    for month, group in df.groupby('month', sort=True, observed=True):
+        group = (
+            group.drop(columns='month')
+                 .set_index('close_time')
+                 .dropna(axis=1, how='all')
+        )
+        monthly_groups[str(month)] = group
+
+    return monthly_groups
 
@@ -1,6 +1,124 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from dataclasses import dataclass
+from numba import njit
+
+@dataclass
+class MonthlyPanel:
+    """
+    Structure-of-arrays layout of monthly returns for hot backtest loops.
+
+    The dict-of-DataFrames from `group_returns_by_month` pays string
+    hashing, dict lookup and pandas dispatch on every month. This packs
+    the same data into one dense matrix plus offset bookkeeping so kernels
+    can run over all months without touching Python objects.
+
+    Attributes
+    ----------
+    data : np.ndarray
+        (days x coins) float32 returns; NaN where a coin is inactive that month.
+    dates : pd.DatetimeIndex
+        Row labels of `data`.
+    coins : np.ndarray
+        Column labels of `data`.
+    months : np.ndarray
+        Month label ('YYYY-MM') per month block, in row order.
+    offsets : np.ndarray
+        int32 array of length len(months) + 1; month m spans rows
+        offsets[m]:offsets[m + 1].
+    """
+    data: np.ndarray
+    dates: pd.DatetimeIndex
+    coins: np.ndarray
+    months: np.ndarray
+    offsets: np.ndarray
+
+    @classmethod
+    def from_monthly_returns(cls, monthly_returns: dict) -> "MonthlyPanel":
+        """
+        Packs a `group_returns_by_month` dict into a MonthlyPanel.
+        """
+        if not monthly_returns:
+            raise ValueError("monthly_returns is empty; nothing to pack into a MonthlyPanel")
+
+        months = sorted(monthly_returns)
+        frames = [monthly_returns[month] for month in months]
+
+        coin_index = pd.Index([])
+        for frame in frames:
+            coin_index = coin_index.union(frame.columns)
+
+        offsets = np.zeros(len(months) + 1, dtype=np.int32)
+        np.cumsum([len(frame) for frame in frames], out=offsets[1:])
+
+        data = np.full((offsets[-1], len(coin_index)), np.nan, dtype=np.float32)
+        for m, frame in enumerate(frames):
+            columns = coin_index.get_indexer(frame.columns)
+            data[offsets[m]:offsets[m + 1], columns] = frame.to_numpy()
+
+        dates = frames[0].index.append([frame.index for frame in frames[1:]])
+
+        return cls(
+            data=data,
+            dates=dates,
+            coins=coin_index.to_numpy(),
+            months=np.asarray(months),
+            offsets=offsets,
+        )
+
+@njit(cache=True)
+def _panel_portfolio_returns(data, offsets, weight_rows):
+    """
+    Per-month dot products over a MonthlyPanel, skipping zero weights and
+    NaN entries. Weights come from the previous month's coin set, so a
+    nonzero weight can land on a coin that is inactive (NaN) this month;
+    treating it as 0 matches apply_weights' reindex + fillna semantics.
+    Wealth is compounded in the same loop, so consumers that want the
+    cumulative curve avoid a second pass over the returns.
+    """
+    out = np.empty(offsets[-1], dtype=np.float64)
+    out_wealth = np.empty(offsets[-1], dtype=np.float64)
+    wealth = 1.0
+    for m in range(len(offsets) - 1):
+        for i in range(offsets[m], offsets[m + 1]):
+            acc = 0.0
+            for j in range(data.shape[1]):
+                w = weight_rows[m, j]
+                value = data[i, j]
+                if w != 0.0 and value == value:
+                    acc += w * value
+            out[i] = acc
+            wealth *= 1.0 + acc
+            out_wealth[i] = wealth
+    return out, out_wealth
+
+@njit(cache=True, fastmath=True)
+def _portfolio_stats(returns):
+    """
+    Streams once over daily returns, tracking wealth, its running max, the
+    deepest drawdown and Welford mean/variance in scalars, instead of the
+    six separate pandas sweeps (prod, mean, std, cumprod, cummax, min).
+    """
+    wealth = 1.0
+    running_max = 1.0
+    max_dd = 0.0
+    mean = 0.0
+    m2 = 0.0
+    n = len(returns)
+    for i in range(n):
+        r = returns[i]
+        wealth *= 1.0 + r
+        if wealth > running_max:
+            running_max = wealth
+        drawdown = (wealth - running_max) / running_max
+        if drawdown < max_dd:
+            max_dd = drawdown
+        delta = r - mean
+        mean += delta / (i + 1)
+        m2 += delta * (r - mean)
+    variance = m2 / (n - 1) if n > 1 else 0.0
+    return wealth, max_dd, mean, variance
 
 def compute_equal_weights(monthly_returns: pd.DataFrame) -> pd.Series:
     """
@@ -39,7 +157,40 @@ def compute_vol_scaled_weights(prev_month_returns: pd.DataFrame) -> pd.Series:
     weights = inv_vol / inv_vol.sum()
     return weights
 
-def compute_momentum_weights(prev_month_returns: pd.DataFrame, top_quantile: float = 0.2) -> pd.Series:
+def _monthly_total_return(month_returns: pd.DataFrame) -> np.ndarray:
+    """
+    Cumulative return per coin over one month, as a log-sum: sum(log1p) +
+    expm1 is numerically stable for long lookbacks and vectorizes better
+    than the chained product. Valid because daily returns are always > -1.
+    """
+    return np.expm1(np.log1p(month_returns.to_numpy()).sum(axis=0))
+
+def precompute_monthly_total_returns(monthly_returns: dict) -> dict:
+    """
+    Precomputes each month's per-coin cumulative return in one pass.
+
+    Backtests that run both the momentum and the reversal strategy rank
+    coins by the same monthly total return; passing these precomputed
+    Series into the weight functions halves that ranking work.
+
+    Parameters
+    ----------
+    monthly_returns : dict
+        Keys = month as string ('YYYY-MM'), values = daily returns DataFrame
+        for that month (coins as columns).
+
+    Returns
+    -------
+    dict
+        Keys = month as string, values = Series of cumulative returns per coin.
+    """
+    return {
+        month: pd.Series(_monthly_total_return(df), index=df.columns)
+        for month, df in monthly_returns.items()
+    }
+
+def compute_momentum_weights(prev_month_returns: pd.DataFrame, top_quantile: float = 0.2,
+                             total_returns: pd.Series = None) -> pd.Series:
     """
     Computes momentum-based weights: long top quantile of coins 
     ranked by previous month's total return.
@@ -50,29 +201,34 @@ def compute_momentum_weights(prev_month_returns: pd.DataFrame, top_quantile: flo
         Daily returns for the previous month.
     top_quantile : float
         Fraction of top coins to select (default = 0.2 = top 20%).
+    total_returns : pd.Series, optional
+        Precomputed cumulative returns for the previous month (see
+        `precompute_monthly_total_returns`); computed here when omitted.
 
     Returns
     -------
     pd.Series
         Equal weights among top momentum coins (sums to 1).
     """
-    # 1. Compute cumulative return over previous month
-    momentum = (1 + prev_month_returns).prod() - 1
-
-    # 2. Find cutoff for top performers
-    cutoff = momentum.quantile(1 - top_quantile)
+    # 1. Cumulative return over previous month (reused if precomputed)
+    if total_returns is None:
+        momentum = _monthly_total_return(prev_month_returns)
+    else:
+        momentum = total_returns.reindex(prev_month_returns.columns).to_numpy()
 
-    # 3. Select top quantile coins
-    winners = momentum[momentum >= cutoff].index
+    # 2. Pick the top-k coins with an O(n) partial partition instead of
+    #    sorting everything through .quantile()
+    k = max(1, int(top_quantile * len(momentum)))
+    winners = np.argpartition(-momentum, k - 1)[:k]
 
-    # 4. Equal weight among winners
-    weights = pd.Series(0.0, index=momentum.index, dtype=float)
-    if len(winners) > 0:
-        weights[winners] = 1.0 / len(winners)
+    # 3. Equal weight among winners
+    weights = np.zeros(len(momentum))
+    weights[winners] = 1.0 / k
 
-    return weights
+    return pd.Series(weights, index=prev_month_returns.columns)
 
-def compute_reversal_weights(prev_month_returns: pd.DataFrame, bottom_quantile: float = 0.2) -> pd.Series:
+def compute_reversal_weights(prev_month_returns: pd.DataFrame, bottom_quantile: float = 0.2,
+                             total_returns: pd.Series = None) -> pd.Series:
     """
     Computes short-term reversal-based weights: long bottom quantile 
     of coins ranked by previous month's total return.
@@ -83,27 +239,31 @@ def compute_reversal_weights(prev_month_returns: pd.DataFrame, bottom_quantile:
         Daily returns for the previous month.
     bottom_quantile : float
         Fraction of bottom coins to select (default = 0.2 = bottom 20%).
+    total_returns : pd.Series, optional
+        Precomputed cumulative returns for the previous month (see
+        `precompute_monthly_total_returns`); computed here when omitted.
 
     Returns
     -------
     pd.Series
         Equal weights among bottom momentum coins (sums to 1).
     """
-    # 1. Compute cumulative return over previous month
-    momentum = (1 + prev_month_returns).prod() - 1
-
-    # 2. Find cutoff for worst performers
-    cutoff = momentum.quantile(bottom_quantile)
+    # 1. Cumulative return over previous month (reused if precomputed)
+    if total_returns is None:
+        momentum = _monthly_total_return(prev_month_returns)
+    else:
+        momentum = total_returns.reindex(prev_month_returns.columns).to_numpy()
 
-    # 3. Select bottom quantile coins
-    losers = momentum[momentum <= cutoff].index
+    # 2. Pick the bottom-k coins with an O(n) partial partition instead of
+    #    sorting everything through .quantile()
+    k = max(1, int(bottom_quantile * len(momentum)))
+    losers = np.argpartition(momentum, k - 1)[:k]
 
-    # 4. Equal weight among losers
-    weights = pd.Series(0.0, index=momentum.index, dtype=float)
-    if len(losers) > 0:
-        weights[losers] = 1.0 / len(losers)
+    # 3. Equal weight among losers
+    weights = np.zeros(len(momentum))
+    weights[losers] = 1.0 / k
 
-    return weights
+    return pd.Series(weights, index=prev_month_returns.columns)
 
 def apply_weights(month_returns: pd.DataFrame, weights: pd.Series) -> pd.Series:
     """
@@ -123,9 +283,116 @@ def apply_weights(month_returns: pd.DataFrame, weights: pd.Series) -> pd.Series:
     """
     # Align weights with available assets
     weights = weights.reindex(month_returns.columns).fillna(0)
+
+    # Equal weights are the common case: a row sum times the scalar 1/n
+    # beats the generic dot, which allocates and reads a full weight vector.
+    if weights.nunique() == 1:
+        return month_returns.sum(axis=1) * weights.iloc[0]
+
+    # Momentum/reversal weights zero out most coins; when under half the
+    # weights are active, multiplying just those columns beats a dense dot
+    # that still reads every column.
+    weight_values = weights.to_numpy()
+    active = weight_values != 0
+    if active.sum() < 0.5 * len(weight_values):
+        portfolio_values = month_returns.to_numpy()[:, active] @ weight_values[active]
+        return pd.Series(portfolio_values, index=month_returns.index)
+
     portfolio_returns = month_returns.dot(weights)
     return portfolio_returns
 
+def compute_portfolio_returns(monthly_returns, monthly_weights: dict, return_wealth: bool = False):
+    """
+    Computes daily portfolio returns across all months in one shot.
+
+    Replaces the per-month `apply_weights` + `pd.concat` loop: all monthly
+    return frames are stacked into a single (days x coins) matrix, the
+    monthly weight rows are broadcast across their days, and the portfolio
+    return falls out of one fused multiply-sum.
+
+    Parameters
+    ----------
+    monthly_returns : dict or MonthlyPanel
+        Either a dict keyed by month string ('YYYY-MM') of daily returns
+        DataFrames (coins as columns), or a packed MonthlyPanel, which is
+        evaluated by a compiled per-month kernel with no Python dispatch.
+    monthly_weights : dict
+        Keys = month as string ('YYYY-MM'), values = weights Series to apply
+        to that month's returns. Months missing from `monthly_returns` are
+        skipped.
+    return_wealth : bool
+        If True, also return the growth-of-1 wealth curve, compounded in
+        the same pass rather than by a separate cumprod downstream.
+
+    Returns
+    -------
+    pd.Series or (pd.Series, pd.Series)
+        Daily portfolio returns over all weighted months, plus the wealth
+        curve when `return_wealth` is set.
+    """
+    if isinstance(monthly_returns, MonthlyPanel):
+        panel = monthly_returns
+        coin_index = pd.Index(panel.coins)
+        weight_rows = np.zeros((len(panel.months), len(panel.coins)))
+        weighted = np.zeros(len(panel.months), dtype=bool)
+        for m, month in enumerate(panel.months):
+            if month in monthly_weights:
+                weight_rows[m] = (
+                    monthly_weights[month].reindex(coin_index).fillna(0).to_numpy()
+                )
+                weighted[m] = True
+
+        portfolio_returns, wealth = _panel_portfolio_returns(
+            panel.data, panel.offsets, weight_rows
+        )
+
+        # Keep only the rows of months that actually had weights, matching
+        # the dict path below. Unweighted months return 0, so the wealth
+        # curve compounds correctly across the gap.
+        keep = np.concatenate([
+            np.arange(panel.offsets[m], panel.offsets[m + 1])
+            for m in np.flatnonzero(weighted)
+        ]) if weighted.any() else np.array([], dtype=np.int64)
+        index = panel.dates[keep]
+        if return_wealth:
+            return (
+                pd.Series(portfolio_returns[keep], index=index),
+                pd.Series(wealth[keep], index=index),
+            )
+        return pd.Series(portfolio_returns[keep], index=index)
+
+    months = [
+        month for month in sorted(monthly_weights)
+        if month in monthly_returns and not monthly_returns[month].empty
+    ]
+    if not months:
+        empty = pd.Series(dtype=float)
+        return (empty, empty.copy()) if return_wealth else empty
+
+    stacked = pd.concat([monthly_returns[month] for month in months])
+    columns = stacked.columns
+
+    # One weight row per month, repeated over that month's days. Coins absent
+    # from a month get weight 0, matching apply_weights' reindex+fillna.
+    weight_rows = np.vstack([
+        monthly_weights[month].reindex(columns).fillna(0).to_numpy()
+        for month in months
+    ])
+    days_per_month = np.array([len(monthly_returns[month]) for month in months])
+    weights_matrix = np.repeat(weight_rows, days_per_month, axis=0)
+
+    # NaNs only appear where a coin is absent (weight 0), so zero them out.
+    returns_matrix = np.nan_to_num(stacked.to_numpy())
+    portfolio_returns = np.einsum('ij,ij->i', returns_matrix, weights_matrix)
+
+    if return_wealth:
+        wealth = np.cumprod(1.0 + portfolio_returns)
+        return (
+            pd.Series(portfolio_returns, index=stacked.index),
+            pd.Series(wealth, index=stacked.index),
+        )
+    return pd.Series(portfolio_returns, index=stacked.index)
+
 def evaluate_portfolio(portfolio_returns: pd.Series, freq: int = 252) -> dict:
     """
     Evaluates performance metrics for a portfolio in Paleologo style.
@@ -142,24 +409,23 @@ def evaluate_portfolio(portfolio_returns: pd.Series, freq: int = 252) -> dict:
     dict
         Dictionary of key performance metrics.
     """
-    # Growth of 1 unit
-    cumulative_return = (1 + portfolio_returns).prod() - 1
+    # Promote to float64 locally: the pipeline stores float32 for bandwidth,
+    # but compounding and variance accumulation here need the full precision.
+    returns_array = portfolio_returns.to_numpy(dtype=np.float64)
+
+    # Wealth, drawdown, mean and variance all fall out of one fused pass
+    final_wealth, max_dd, mean, variance = _portfolio_stats(returns_array)
+    cumulative_return = final_wealth - 1
 
     # Annualized mean return
-    annualized_return = (1 + portfolio_returns.mean()) ** freq - 1
+    annualized_return = (1 + mean) ** freq - 1
 
     # Annualized volatility
-    annualized_vol = portfolio_returns.std() * (freq ** 0.5)
+    annualized_vol = (variance ** 0.5) * (freq ** 0.5)
 
     # Sharpe ratio
     sharpe = (annualized_return) / annualized_vol if annualized_vol > 0 else 0
 
-    # Drawdowns
-    wealth = (1 + portfolio_returns).cumprod()
-    running_max = wealth.cummax()
-    drawdown = (wealth - running_max) / running_max
-    max_dd = drawdown.min()
-
     # Calmar ratio
     calmar = annualized_return / abs(max_dd) if max_dd < 0 else None
 